@@ -1,11 +1,20 @@
+from __future__ import annotations
+
 import os
 import base64
+import hashlib
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import TYPE_CHECKING, Final
 import streamlit as st
 
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+if TYPE_CHECKING:
+    import numpy as np  # imported lazily at runtime, see get_semantic_cache()
+
+logger = logging.getLogger(__name__)
 
 
 # ----------------------------
@@ -30,18 +39,76 @@ MODEL_OPTIONS = [
     "groq/compound-mini",        # Groq system option (nice balance)
     "groq/compound",             # Groq system option (more capable)
 ]
+MODEL_INDEX = {m: i for i, m in enumerate(MODEL_OPTIONS)}  # for selectbox defaults
+
+# Chat history limits: once there are more than MAX_HISTORY_MESSAGES, older
+# messages are folded into a short summary and only the last
+# KEEP_AFTER_SUMMARY messages stay on screen.
+MAX_HISTORY_MESSAGES = 40
+KEEP_AFTER_SUMMARY = 20
+# After this many failed summaries in a row, stop asking Groq and just keep
+# the last MAX_HISTORY_MESSAGES messages.
+MAX_SUMMARY_FAILURES = 3
+
+# Only the newest messages get their own chat bubble; anything older is
+# rendered as one joined Markdown block (much cheaper on every rerun).
+RECENT_BUBBLES = 20
+
+# Small local embedding model for the semantic cache (384-dim vectors).
+EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_DIM = 384
+SEMANTIC_CACHE_CAPACITY = 2048  # rows per session (~0.8 MB as int8)
+SEMANTIC_SCAN_BLOCK = 256  # rows dequantized at a time during a lookup
 
 
 # ----------------------------
-# Prompt + parser
+# Prompt
 # ----------------------------
-prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system", "You are a helpful assistant. Answer clearly, politely, and accurately."),
-        ("user", "Question: {question}"),
-    ]
-)
-parser = StrOutputParser()
+# The system prompt must stay byte-identical across requests: Groq caches the
+# shared prompt prefix, and any change here (even whitespace) breaks that.
+# Anything dynamic (user info, memories, ...) goes in a separate system
+# message AFTER this one, never mixed into it.
+SYSTEM_PROMPT: Final[str] = "You are a helpful assistant. Answer clearly, politely, and accurately."
+SYSTEM_MSG: Final[dict] = {"role": "system", "content": SYSTEM_PROMPT}
+
+
+def build_messages(question: str) -> list:
+    return [SYSTEM_MSG, {"role": "user", "content": f"Question: {question}"}]
+
+
+# Inputs that don't need a model at all. Answering these locally is instant
+# and doesn't spend any API quota.
+GREETING_REPLY = "Hi there! 👋 Ask me anything and I'll do my best to help."
+THANKS_REPLY = "You're welcome! Let me know if you have another question."
+BYE_REPLY = "Goodbye! Come back anytime you have a question."
+QUICK_REPLIES = {
+    **dict.fromkeys(
+        ["hi", "hii", "hello", "hey", "hey there", "hello there", "hi there", "yo", "hola",
+         "good morning", "good afternoon", "good evening"],
+        GREETING_REPLY,
+    ),
+    **dict.fromkeys(
+        ["thanks", "thank you", "thx", "ty", "thanks a lot", "thank you so much", "cheers"],
+        THANKS_REPLY,
+    ),
+    **dict.fromkeys(["bye", "goodbye", "see you", "see ya", "cya"], BYE_REPLY),
+    **dict.fromkeys(["ok", "okay", "k", "cool", "nice", "great"], "👍 Anything else you'd like to ask?"),
+    "test": "It works! ✅ Go ahead and ask a question.",
+}
+MAX_QUESTION_CHARS = 4000
+
+
+def quick_reply(question: str):
+    # Returns a canned answer for empty/trivial/oversized input, else None.
+    q = question.strip()
+    if not q or not any(ch.isalnum() for ch in q):
+        return "Please type a question."
+    if len(q) > MAX_QUESTION_CHARS:
+        return "Your question is too long — please shorten it."
+    return QUICK_REPLIES.get(q.lower().rstrip("!.?~ "))
+
+
+SUMMARY_MSG = {"role": "system", "content": "Summarize this conversation in 3 bullet points."}
 
 
 # ----------------------------
@@ -60,6 +127,15 @@ if "settings" not in st.session_state:
 if "messages" not in st.session_state:
     st.session_state.messages = []  # [{"role": "...", "content": "..."}]
 
+if "history_summary" not in st.session_state:
+    st.session_state.history_summary = ""  # summary of messages that were trimmed away
+    st.session_state.summary_job = None  # (future, n_messages) while a summary is running
+    st.session_state.summary_failures = 0
+    st.session_state.summary_retry_len = 0  # don't retry before history reaches this length
+
+if "response_cache" not in st.session_state:
+    st.session_state.response_cache = {}  # {key_hash: answer}
+
 
 # ----------------------------
 # Assets helpers
@@ -68,9 +144,20 @@ APP_DIR = Path(__file__).parent
 ASSETS_DIR = APP_DIR / "assets"
 
 
-def img_to_data_uri(img_path: Path) -> str:
+# Pick a different background for each page (1,2,3).
+PAGE_BACKGROUNDS = {
+    "landing": ASSETS_DIR / "1.png",
+    "setup": ASSETS_DIR / "2.png",
+    "chat": ASSETS_DIR / "3.png",
+}
+
+
+@st.cache_data(show_spinner=False)
+def img_to_data_uri(img_path_str: str) -> str:
     # Streamlit can't use local file paths directly in CSS on Cloud,
     # so we convert the image to a base64 data URI.
+    # Cached because Streamlit reruns the script on every click.
+    img_path = Path(img_path_str)
     if not img_path.exists():
         return ""
     b64 = base64.b64encode(img_path.read_bytes()).decode("utf-8")
@@ -79,38 +166,28 @@ def img_to_data_uri(img_path: Path) -> str:
     return f"data:image/{mime};base64,{b64}"
 
 
-def set_page_background(page_name: str):
-    # Pick a different background for each page (1,2,3).
-    mapping = {
-        "landing": ASSETS_DIR / "1.png",
-        "setup": ASSETS_DIR / "2.png",
-        "chat": ASSETS_DIR / "3.png",
-    }
-    img_path = mapping.get(page_name, ASSETS_DIR / "1.png")
-    data_uri = img_to_data_uri(img_path)
+def page_background_path(page_name: str) -> Path:
+    return PAGE_BACKGROUNDS.get(page_name, ASSETS_DIR / "1.png")
 
-    if not data_uri:
-        st.warning(f"Background image missing: {img_path}. Put it inside assets/.")
-        data_uri = ""
 
-    st.markdown(
-        f"""
+# Shared styles for every page. Only the background image changes per page,
+# so that part is kept out of here (see set_page_background).
+STATIC_CSS = """
         <style>
         /* Hide Streamlit chrome */
-        #MainMenu {{visibility: hidden;}}
-        footer {{visibility: hidden;}}
-        header {{visibility: hidden;}}
+        #MainMenu {visibility: hidden;}
+        footer {visibility: hidden;}
+        header {visibility: hidden;}
 
-        /* Background */
-        .stApp {{
-            background-image: url("{data_uri}");
+        /* Background (the image itself is set per page) */
+        .stApp {
             background-size: cover;
             background-position: center;
             background-attachment: fixed;
-        }}
+        }
 
         /* Dark overlay so text stays readable */
-        .stApp::before {{
+        .stApp::before {
             content: "";
             position: fixed;
             inset: 0;
@@ -119,87 +196,87 @@ def set_page_background(page_name: str):
                         linear-gradient(180deg, rgba(0,0,0,0.55), rgba(0,0,0,0.72));
             pointer-events: none;
             z-index: 0;
-        }}
+        }
 
         /* Content above overlay */
-        .block-container {{
+        .block-container {
             position: relative;
             z-index: 1;
             max-width: 1200px;
             padding-top: 2rem;
             padding-bottom: 2.5rem;
-        }}
+        }
 
         /* Sidebar */
-        [data-testid="stSidebar"] {{
+        [data-testid="stSidebar"] {
             background: linear-gradient(180deg, rgba(10,10,18,0.92), rgba(5,5,10,0.92));
             border-right: 1px solid rgba(255,255,255,0.08);
-        }}
-        [data-testid="stSidebar"] * {{
+        }
+        [data-testid="stSidebar"] * {
             color: rgba(255,255,255,0.90) !important;
-        }}
+        }
 
         /* Glass panels */
-        .glass {{
+        .glass {
             border-radius: 22px;
             padding: 34px 30px;
             background: rgba(10, 12, 18, 0.55);
             border: 1px solid rgba(255,255,255,0.12);
             box-shadow: 0 18px 55px rgba(0,0,0,0.42);
             backdrop-filter: blur(10px);
-        }}
-        .glass h1 {{
+        }
+        .glass h1 {
             margin: 0;
             font-size: 46px;
             line-height: 1.05;
             letter-spacing: -0.02em;
             color: #ffffff;
-        }}
-        .glass p {{
+        }
+        .glass p {
             margin-top: 12px;
             font-size: 16px;
             line-height: 1.6;
             color: rgba(255,255,255,0.78);
             max-width: 820px;
-        }}
+        }
 
-        .mini-card {{
+        .mini-card {
             border-radius: 18px;
             padding: 18px 18px;
             background: rgba(10, 12, 18, 0.48);
             border: 1px solid rgba(255,255,255,0.10);
             box-shadow: 0 10px 28px rgba(0,0,0,0.30);
             backdrop-filter: blur(10px);
-        }}
-        .mini-card h3 {{
+        }
+        .mini-card h3 {
             margin: 0 0 8px 0;
             font-size: 18px;
             color: #ffffff;
-        }}
-        .mini-card p {{
+        }
+        .mini-card p {
             margin: 0;
             font-size: 14px;
             line-height: 1.55;
             color: rgba(255,255,255,0.74);
-        }}
+        }
 
-        .badges {{
+        .badges {
             margin-top: 16px;
             display: flex;
             gap: 10px;
             flex-wrap: wrap;
-        }}
-        .badge {{
+        }
+        .badge {
             padding: 7px 12px;
             border-radius: 999px;
             background: rgba(255,255,255,0.08);
             border: 1px solid rgba(255,255,255,0.10);
             color: rgba(255,255,255,0.86);
             font-size: 13px;
-        }}
+        }
 
         /* Buttons */
-        div.stButton > button {{
+        div.stButton > button {
             width: 100%;
             border-radius: 14px;
             padding: 12px 16px;
@@ -208,28 +285,40 @@ def set_page_background(page_name: str):
             color: #0b0f14;
             font-weight: 800;
             box-shadow: 0 12px 30px rgba(0,0,0,0.25);
-        }}
+        }
 
         /* Chat shell */
-        .chat-shell {{
+        .chat-shell {
             border-radius: 18px;
             padding: 14px;
             background: rgba(10, 12, 18, 0.45);
             border: 1px solid rgba(255,255,255,0.10);
             box-shadow: 0 10px 30px rgba(0,0,0,0.28);
             backdrop-filter: blur(10px);
-        }}
+        }
 
         /* Make chat input readable */
-        [data-testid="stChatInput"] textarea {{
+        [data-testid="stChatInput"] textarea {
             background: rgba(255,255,255,0.06) !important;
             border: 1px solid rgba(255,255,255,0.16) !important;
             color: rgba(255,255,255,0.92) !important;
-        }}
+        }
         </style>
-        """,
-        unsafe_allow_html=True,
-    )
+        """
+
+
+@st.cache_data(show_spinner=False)
+def build_page_css(page_name: str) -> str:
+    data_uri = img_to_data_uri(str(page_background_path(page_name)))
+    return f'<style>.stApp{{background-image:url("{data_uri}")}}</style>'
+
+
+def set_page_background(page_name: str):
+    img_path = page_background_path(page_name)
+    if not img_to_data_uri(str(img_path)):
+        st.warning(f"Background image missing: {img_path}. Put it inside assets/.")
+
+    st.markdown(build_page_css(page_name), unsafe_allow_html=True)
 
 
 def go(page_name: str):
@@ -240,19 +329,413 @@ def go(page_name: str):
 # ----------------------------
 # LLM call
 # ----------------------------
-def generate_response(question: str) -> str:
-    cfg = st.session_state.settings
+@st.cache_resource(show_spinner=False)
+def get_http_client():
+    # One HTTP/2 connection to Groq shared by every model/settings combo,
+    # so we don't pay a new TLS handshake for each message.
+    # cache_resource makes this one client for the whole app, not per user.
+    # Streamlit runs every session in its own thread, so users chatting at the
+    # same time send their requests concurrently as streams on this shared
+    # connection. A dedicated batching queue wouldn't add anything on top.
+    import httpx
+
+    return httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=4, keepalive_expiry=300),
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_llm(model: str, temperature: float, max_tokens: int):
+    # One client per settings combo, so the HTTP connection pool is reused
+    # across messages and reruns instead of being rebuilt every time.
+    # Imported here so LangChain/OpenAI only load once the chat actually needs
+    # them; the landing and setup pages start faster without them.
+    from langchain_openai import ChatOpenAI
 
-    llm = ChatOpenAI(
+    return ChatOpenAI(
         api_key=groq_api_key,
         base_url=GROQ_BASE_URL,
-        model=cfg["model"],
-        temperature=cfg["temperature"],
-        max_tokens=cfg["max_tokens"],
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        streaming=True,
+        http_client=get_http_client(),
+    )
+
+
+# Only near-deterministic answers are cached. With a higher temperature the
+# user expects a different answer each time, so we always ask Groq.
+CACHE_MAX_TEMPERATURE = 0.05
+
+# How close two questions must be (cosine similarity) to reuse an answer.
+# Kept high on purpose so we don't answer a different question by mistake.
+SEMANTIC_CACHE_THRESHOLD = 0.92
+
+# Cached answers are also written to disk so they survive app restarts
+# (Streamlit Cloud puts idle apps to sleep and wipes memory).
+CACHE_DB_PATH = APP_DIR / "cache.db"
+
+
+@st.cache_resource(show_spinner=False)
+def get_embedder():
+    # Imported here so the model (and torch) only load when the cache is used.
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(EMBED_MODEL_NAME)
+
+
+def warm_up_embedder(temperature: float):
+    # Loads the embedding model in the background as soon as a low enough
+    # temperature is picked, so the first chat message doesn't stall on it.
+    # At higher temperatures the semantic cache is never used, so we skip the
+    # load (torch + model are a few hundred MB).
+    if temperature > CACHE_MAX_TEMPERATURE or st.session_state.get("embedder_warmup_started"):
+        return
+    st.session_state.embedder_warmup_started = True
+
+    from streamlit.runtime.scriptrunner import add_script_run_ctx
+
+    # The thread gets this run's script context so st.cache_resource works
+    # without "missing ScriptRunContext" warnings.
+    thread = threading.Thread(target=load_embedder_quietly, daemon=True)
+    add_script_run_ctx(thread)
+    thread.start()
+
+
+def load_embedder_quietly():
+    # Errors in a background thread would otherwise vanish; log them instead.
+    # The chat still works without the model (see generate_response).
+    try:
+        get_embedder()
+    except Exception:
+        logger.warning("Preloading the embedding model failed", exc_info=True)
+
+
+def embed_question(question: str) -> np.ndarray:
+    import numpy as np
+
+    return np.asarray(get_embedder().encode(question), dtype=np.float32)
+
+
+def settings_key(cfg: dict) -> str:
+    return f"{cfg['model']}|{cfg['temperature']}|{cfg['max_tokens']}"
+
+
+def response_cache_key(cfg: dict, question: str) -> str:
+    raw = f"{settings_key(cfg)}|{question}"
+    return hashlib.blake2b(raw.encode("utf-8")).hexdigest()
+
+
+@st.cache_resource(show_spinner=False)
+def get_cache_db():
+    # One connection for the whole app; writes go through get_cache_db_lock().
+    conn = sqlite3.connect(str(CACHE_DB_PATH), check_same_thread=False)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cache("
+        "key TEXT PRIMARY KEY, settings TEXT, question TEXT, answer TEXT, emb BLOB)"
     )
+    conn.commit()
+    return conn
+
+
+@st.cache_resource(show_spinner=False)
+def get_cache_db_lock():
+    return threading.Lock()
+
+
+# The disk cache is only a speed-up: if SQLite fails (read-only disk, corrupt
+# file, ...) reads count as a miss and writes are skipped, the chat keeps working.
+def db_get_answer(key: str):
+    try:
+        with get_cache_db_lock():
+            row = get_cache_db().execute("SELECT answer FROM cache WHERE key = ?", (key,)).fetchone()
+    except sqlite3.Error:
+        logger.warning("Reading the answer cache failed", exc_info=True)
+        return None
+    return row[0] if row else None
+
+
+def db_put(key: str, cfg: dict, question: str, answer: str, q_emb: np.ndarray):
+    # Embeddings are stored as float16: half the size, and the precision loss
+    # is far below what matters for a 0.92 similarity threshold.
+    import numpy as np
+
+    emb_blob = np.asarray(q_emb, dtype=np.float16).tobytes()
+    try:
+        with get_cache_db_lock():
+            conn = get_cache_db()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache(key, settings, question, answer, emb) VALUES (?, ?, ?, ?, ?)",
+                (key, settings_key(cfg), question, answer, emb_blob),
+            )
+            conn.commit()
+    except sqlite3.Error:
+        logger.warning("Writing to the answer cache failed", exc_info=True)
+
+
+def quantize_embedding(emb: np.ndarray):
+    # Symmetric int8 quantization of an L2-normalized vector: emb ≈ q * scale.
+    # A zero vector (never expected from the encoder) gets scale 0, so it
+    # can never match anything.
+    import numpy as np
+
+    norm = np.linalg.norm(emb)
+    if norm == 0:
+        return np.zeros(len(emb), dtype=np.int8), np.float32(0.0)
+    emb = emb / norm
+    scale = float(np.max(np.abs(emb))) / 127.0
+    return np.round(emb / scale).astype(np.int8), np.float32(scale)
+
+
+def get_semantic_cache() -> dict:
+    # Created on first use (not at session start) so numpy is only imported
+    # once the semantic cache is actually needed.
+    if "semantic_cache" not in st.session_state:
+        import numpy as np
+
+        # Fixed-size arrays, filled row by row. Rows are L2-normalized so a single
+        # matrix-vector product gives the cosine similarity against every entry.
+        # Embeddings are kept as int8 (one float scale per row) to use 4x less memory.
+        st.session_state.semantic_cache = {
+            "emb_matrix": np.zeros((SEMANTIC_CACHE_CAPACITY, EMBED_DIM), dtype=np.int8),
+            "scales": np.zeros(SEMANTIC_CACHE_CAPACITY, dtype=np.float32),
+            "settings_ids": np.full(SEMANTIC_CACHE_CAPACITY, -1, dtype=np.int32),
+            "last_used": np.zeros(SEMANTIC_CACHE_CAPACITY, dtype=np.int64),  # for LRU eviction
+            "entries": [],  # [(question, answer)], same order as emb_matrix rows
+            "settings_index": {},  # {settings_key: settings_id}
+            "used": 0,
+            "tick": 0,
+        }
+    return st.session_state.semantic_cache
+
+
+def semantic_cache_insert(cache: dict, settings: str, question: str, answer: str, q_emb: np.ndarray):
+    # Writes one row; once the cache is full, the least recently used row is replaced.
+    import numpy as np
+
+    used = cache["used"]
+    if used < SEMANTIC_CACHE_CAPACITY:
+        row = used
+        cache["used"] = used + 1
+        cache["entries"].append((question, answer))
+    else:
+        row = int(np.argmin(cache["last_used"]))
+        cache["entries"][row] = (question, answer)
+
+    settings_id = cache["settings_index"].setdefault(settings, len(cache["settings_index"]))
+    cache["emb_matrix"][row], cache["scales"][row] = quantize_embedding(q_emb)
+    cache["settings_ids"][row] = settings_id
+    cache["tick"] += 1
+    cache["last_used"][row] = cache["tick"]
+
+
+def load_semantic_cache_from_db():
+    # Fills this session's semantic cache with what's saved on disk (once).
+    import numpy as np
+
+    cache = get_semantic_cache()
+    if cache.get("loaded_from_db"):
+        return
+    cache["loaded_from_db"] = True
+
+    try:
+        with get_cache_db_lock():
+            rows = get_cache_db().execute(
+                "SELECT settings, question, answer, emb FROM cache ORDER BY rowid DESC LIMIT ?",
+                (SEMANTIC_CACHE_CAPACITY,),
+            ).fetchall()
+    except sqlite3.Error:
+        logger.warning("Loading the semantic cache from disk failed", exc_info=True)
+        return
+
+    # Oldest first, so the newest rows end up as the most recently used.
+    for settings, question, answer, emb in reversed(rows):
+        q_emb = np.frombuffer(emb, dtype=np.float16).astype(np.float32)
+        semantic_cache_insert(cache, settings, question, answer, q_emb)
+
+
+def semantic_cache_lookup(cfg: dict, q_emb: np.ndarray):
+    # Returns the stored answer of the most similar earlier question
+    # (asked with the same settings), or None if nothing is close enough.
+    import numpy as np
+
+    load_semantic_cache_from_db()
+    cache = get_semantic_cache()
+    used = cache["used"]
+    settings_id = cache["settings_index"].get(settings_key(cfg))
+    if not used or settings_id is None:
+        return None
+
+    q_norm = np.linalg.norm(q_emb)
+    if q_norm == 0:
+        return None
+    q = (q_emb / q_norm).astype(np.float32)
+
+    # NumPy's integer matmul doesn't use BLAS, so rows are dequantized to
+    # float32 one small block at a time and scanned with a BLAS SGEMV. The
+    # block stays cache-sized, so the scan costs about the same as a plain
+    # float32 matrix while storage stays int8.
+    emb_matrix, scales = cache["emb_matrix"], cache["scales"]
+    sims = np.empty(used, dtype=np.float32)
+    for start in range(0, used, SEMANTIC_SCAN_BLOCK):
+        stop = min(start + SEMANTIC_SCAN_BLOCK, used)
+        sims[start:stop] = (emb_matrix[start:stop].astype(np.float32) @ q) * scales[start:stop]
+    sims[cache["settings_ids"][:used] != settings_id] = -1.0
+
+    best = int(np.argmax(sims))
+    if sims[best] > SEMANTIC_CACHE_THRESHOLD:
+        cache["tick"] += 1
+        cache["last_used"][best] = cache["tick"]
+        return cache["entries"][best][1]
+    return None
+
+
+def semantic_cache_add(cfg: dict, q_emb: np.ndarray, question: str, answer: str):
+    semantic_cache_insert(get_semantic_cache(), settings_key(cfg), question, answer, q_emb)
+
+
+def generate_response(question: str):
+    # Yields the answer token by token, so the chat page can show text as soon
+    # as Groq sends the first token. Cache hits go through the same path.
+    # On a cacheable miss, what's needed to store the answer is parked in
+    # st.session_state.pending_cache_write for cache_answer() to pick up.
+    st.session_state.pending_cache_write = None
+    reply = quick_reply(question)
+    if reply is not None:
+        yield reply
+        return
 
-    chain = prompt | llm | parser
-    return chain.invoke({"question": question})
+    cfg = st.session_state.settings
+    cache = st.session_state.response_cache
+    key = response_cache_key(cfg, question)
+
+    if key in cache:
+        yield cache[key]
+        return
+
+    cacheable = cfg["temperature"] <= CACHE_MAX_TEMPERATURE
+    q_emb = None
+    if cacheable:
+        # Asked before, maybe in an earlier session or before a restart.
+        cached = db_get_answer(key)
+        if cached is not None:
+            cache[key] = cached
+            yield cached
+            return
+
+        # Same question in different words ("What is X?" vs "Tell me about X").
+        # If the embedding model can't load (no Hub access, out of memory, ...)
+        # we just skip this step and ask Groq.
+        try:
+            q_emb = embed_question(question)
+            cached = semantic_cache_lookup(cfg, q_emb)
+        except Exception:
+            logger.warning("Semantic cache unavailable", exc_info=True)
+            q_emb = cached = None
+        if cached is not None:
+            yield cached
+            return
+
+    if cacheable:
+        st.session_state.pending_cache_write = (key, dict(cfg), question, q_emb)
+
+    llm = get_llm(cfg["model"], float(cfg["temperature"]), int(cfg["max_tokens"]))
+    for chunk in llm.stream(build_messages(question)):
+        yield chunk.content
+
+
+def cache_answer(answer: str):
+    # Called once the stream has been fully shown, so a failing cache write
+    # can never interrupt (or hide) an answer the user already sees.
+    pending = st.session_state.pop("pending_cache_write", None)
+    if pending is None:
+        return
+    key, cfg, question, q_emb = pending
+    st.session_state.response_cache[key] = answer
+    if q_emb is not None:
+        # Disk rows always carry an embedding, so without one we only keep
+        # the in-memory exact match.
+        semantic_cache_add(cfg, q_emb, question, answer)
+        db_put(key, cfg, question, answer, q_emb)
+
+
+# ----------------------------
+# Chat history
+# ----------------------------
+@st.cache_resource(show_spinner=False)
+def get_summary_executor():
+    # Shared by every session, so a few workers keep one user's summary from
+    # waiting behind everyone else's. Each session tracks its own future.
+    return ThreadPoolExecutor(max_workers=4)
+
+
+def summarize_history(llm, summary: str, messages: list) -> str:
+    # Runs in the background thread, so it must not touch st.session_state.
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    if summary:
+        transcript = f"Earlier summary:\n{summary}\n\n{transcript}"
+    return llm.invoke([SUMMARY_MSG, {"role": "user", "content": transcript}]).content
+
+
+def trim_history():
+    # Keeps the message list (and the rerender cost) bounded. Older messages
+    # are summarized in the background so the user isn't kept waiting, and
+    # they're only removed once their summary is in, so nothing gets lost.
+    job = st.session_state.summary_job
+    if job is not None:
+        future, n_summarized = job
+        if not future.done():
+            return
+        st.session_state.summary_job = None
+        if future.exception() is None:
+            st.session_state.history_summary = future.result()
+            st.session_state.messages = st.session_state.messages[n_summarized:]
+            st.session_state.summary_failures = 0
+        else:
+            # Retry after the next turn rather than on every rerun.
+            logger.warning("Summarizing chat history failed", exc_info=future.exception())
+            st.session_state.summary_failures += 1
+            st.session_state.summary_retry_len = len(st.session_state.messages) + 2
+
+    messages = st.session_state.messages
+    if len(messages) <= MAX_HISTORY_MESSAGES:
+        return
+
+    if st.session_state.summary_failures >= MAX_SUMMARY_FAILURES:
+        # Summaries keep failing (e.g. transcript too long for the model):
+        # fall back to a plain sliding window.
+        st.session_state.messages = messages[-MAX_HISTORY_MESSAGES:]
+        return
+    if len(messages) < st.session_state.summary_retry_len:
+        return
+
+    older = messages[:-KEEP_AFTER_SUMMARY]
+    cfg = st.session_state.settings
+    llm = get_llm(cfg["model"], 0.0, 256)
+    future = get_summary_executor().submit(
+        summarize_history, llm, st.session_state.history_summary, older
+    )
+    st.session_state.summary_job = (future, len(older))
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def join_history_markdown(messages: tuple) -> str:
+    # messages is a tuple of (role, content) so it can be hashed by st.cache_data.
+    labels = {"user": "You", "assistant": "Assistant"}
+    return "\n\n---\n\n".join(f"**{labels.get(role, role)}:** {content}" for role, content in messages)
+
+
+def render_history():
+    messages = st.session_state.messages
+    older, recent = messages[:-RECENT_BUBBLES], messages[-RECENT_BUBBLES:]
+
+    if older:
+        st.markdown(join_history_markdown(tuple((m["role"], m["content"]) for m in older)))
+
+    for msg in recent:
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
 
 
 # ----------------------------
@@ -346,9 +829,7 @@ def setup_page():
         model = st.selectbox(
             "Select Groq model",
             MODEL_OPTIONS,
-            index=MODEL_OPTIONS.index(st.session_state.settings["model"])
-            if st.session_state.settings["model"] in MODEL_OPTIONS
-            else 0,
+            index=MODEL_INDEX.get(st.session_state.settings["model"], 0),
         )
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -363,6 +844,7 @@ def setup_page():
             "Max tokens", 64, 2048, int(st.session_state.settings["max_tokens"]), 64
         )
         st.markdown("</div>", unsafe_allow_html=True)
+    warm_up_embedder(temperature)
 
     st.write("")
     a1, a2, a3 = st.columns([1, 1, 1])
@@ -396,9 +878,7 @@ def chat_page():
     st.session_state.settings["model"] = st.sidebar.selectbox(
         "Model",
         MODEL_OPTIONS,
-        index=MODEL_OPTIONS.index(st.session_state.settings["model"])
-        if st.session_state.settings["model"] in MODEL_OPTIONS
-        else 0,
+        index=MODEL_INDEX.get(st.session_state.settings["model"], 0),
     )
     st.session_state.settings["temperature"] = st.sidebar.slider(
         "Temperature", 0.0, 1.0, float(st.session_state.settings["temperature"]), 0.05
@@ -406,9 +886,14 @@ def chat_page():
     st.session_state.settings["max_tokens"] = st.sidebar.slider(
         "Max tokens", 64, 2048, int(st.session_state.settings["max_tokens"]), 64
     )
+    warm_up_embedder(st.session_state.settings["temperature"])
 
     if st.sidebar.button("🧹 Clear chat"):
         st.session_state.messages = []
+        st.session_state.history_summary = ""
+        st.session_state.summary_job = None
+        st.session_state.summary_failures = 0
+        st.session_state.summary_retry_len = 0
         st.rerun()
 
     st.sidebar.divider()
@@ -428,35 +913,45 @@ def chat_page():
     )
     st.write("")
 
+    # Not wrapped in @st.fragment on purpose: st.chat_input is only pinned to
+    # the bottom of the page when it's outside one, and with the input outside
+    # a fragment would have no widgets left to trigger a partial rerun.
+    user_text = st.chat_input("Type your message...")
+    render_chat(user_text)
+
+
+def render_chat(user_text):
     st.markdown('<div class="chat-shell">', unsafe_allow_html=True)
 
     # Show history
-    for msg in st.session_state.messages:
-        with st.chat_message(msg["role"]):
-            st.markdown(msg["content"])
+    trim_history()
+    if st.session_state.history_summary:
+        with st.expander("Earlier in this chat"):
+            st.markdown(st.session_state.history_summary)
 
-    # Input + response
-    user_text = st.chat_input("Type your message...")
+    render_history()
 
+    # Response to the new message
     if user_text:
         st.session_state.messages.append({"role": "user", "content": user_text})
         with st.chat_message("user"):
             st.markdown(user_text)
 
         with st.chat_message("assistant"):
-            with st.spinner("Generating..."):
-                try:
-                    answer = generate_response(user_text)
-                    st.markdown(answer)
-                    st.session_state.messages.append({"role": "assistant", "content": answer})
-                except Exception as e:
-                    # If a model ever gets retired again, the error message can be confusing,
-                    # so we show a cleaner hint here.
-                    err = str(e)
-                    if "model_decommissioned" in err or "decommissioned" in err:
-                        st.error("That model was retired by Groq. Pick a different model from the dropdown.")
-                    else:
-                        st.error(f"Error: {e}")
+            # No spinner here: tokens start showing up right away.
+            try:
+                answer = st.write_stream(generate_response(user_text))
+                st.session_state.messages.append({"role": "assistant", "content": answer})
+                cache_answer(answer)
+                trim_history()
+            except Exception as e:
+                # If a model ever gets retired again, the error message can be confusing,
+                # so we show a cleaner hint here.
+                err = str(e)
+                if "model_decommissioned" in err or "decommissioned" in err:
+                    st.error("That model was retired by Groq. Pick a different model from the dropdown.")
+                else:
+                    st.error(f"Error: {e}")
 
     st.markdown("</div>", unsafe_allow_html=True)
 
@@ -464,6 +959,8 @@ def chat_page():
 # ----------------------------
 # Router
 # ----------------------------
+st.markdown(STATIC_CSS, unsafe_allow_html=True)
+
 if st.session_state.page == "landing":
     landing_page()
 elif st.session_state.page == "setup":